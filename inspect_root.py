@@ -3,11 +3,36 @@
 
 import uproot
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # Non-interactive backend; plots are only written to disk
 import matplotlib.pyplot as plt
 from pathlib import Path
+from plotting import histogram
 
-# Open ROOT file
-with uproot.open("output/simulation_results.root") as f:
+ROOT_FILE = Path("output/simulation_results.root")
+PARQUET_FILE = Path("output/simulation_results.parquet")
+
+# Optional: pyarrow reads the Parquet copy written next to the ROOT file
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+plt.rcParams["savefig.dpi"] = 100
+
+
+def iter_columns(tree, columns, step_size):
+    """Yield chunks of NumPy columns, from the Parquet copy when it is up to date"""
+    if (pq is not None and PARQUET_FILE.exists()
+            and PARQUET_FILE.stat().st_mtime >= ROOT_FILE.stat().st_mtime):
+        for batch in pq.ParquetFile(PARQUET_FILE).iter_batches(batch_size=1 << 20, columns=columns):
+            yield {name: batch.column(name).to_numpy() for name in columns}
+    else:
+        yield from tree.iterate(columns, step_size=step_size, library="np")
+
+
+def inspect_file(f):
+    """Print the events tree contents and statistics and write the plots"""
     print("=" * 60)
     print("ROOT File Inspection")
     print("=" * 60)
@@ -27,27 +52,58 @@ with uproot.open("output/simulation_results.root") as f:
     print("Sample Data (First 5 Events)")
     print("=" * 60)
     
-    event_id = tree["event_id"].array()
-    particle_id = tree["particle_id"].array()
-    truth_energy = tree["truth_energy"].array()
-    energy_deposited = tree["energy_deposited"].array()
-    tracks = tree["tracks_created"].array()
+    # Read all needed branches in one pass; the preview only needs the head
+    branches = ["event_id", "particle_id", "truth_energy", "energy_deposited", "tracks_created"]
+    head = tree.arrays(branches, entry_stop=5, library="np")
+    
+    # Convert each column to Python scalars once, then format row by row
+    rows = zip(*(head[name].tolist() for name in branches))
+    print("\n".join(
+        f"\nEvent {eid}:\n"
+        f"  Particle ID (PDG): {pid} (gamma=22)\n"
+        f"  Truth Energy: {e_truth:.3f} MeV\n"
+        f"  Energy Deposited: {e_dep:.3f} MeV\n"
+        f"  Tracks Created: {n_tracks}"
+        for eid, pid, e_truth, e_dep, n_tracks in rows
+    ))
+    
+    # Read the columns in fixed-size chunks, so no branch is ever loaded whole.
+    # The per-event plots below still keep every point until they are saved
+    columns = ["event_id", "truth_energy", "energy_deposited", "tracks_created"]
+    step_size = "100 MB"
     
-    for i in range(min(5, len(event_id))):
-        print(f"\nEvent {event_id[i]}:")
-        print(f"  Particle ID (PDG): {particle_id[i]} (gamma=22)")
-        print(f"  Truth Energy: {truth_energy[i]:.3f} MeV")
-        print(f"  Energy Deposited: {energy_deposited[i]:.3f} MeV")
-        print(f"  Tracks Created: {tracks[i]}")
+    # Pass 1: running statistics (also fixes the histogram bin edges)
+    n_events = 0
+    energy_sum = 0.0
+    energy_sumsq = 0.0
+    energy_min = np.inf
+    energy_max = -np.inf
+    tracks_sum = 0
+    tracks_max = 0
+    for chunk in iter_columns(tree, columns, step_size):
+        energy = chunk["energy_deposited"]
+        tracks = chunk["tracks_created"]
+        if len(energy) == 0:
+            continue
+        n_events += len(energy)
+        energy_sum += float(np.sum(energy, dtype=np.float64))
+        energy_sumsq += float(np.dot(energy, energy.astype(np.float64)))
+        energy_min = min(energy_min, float(np.min(energy)))
+        energy_max = max(energy_max, float(np.max(energy)))
+        tracks_sum += int(np.sum(tracks, dtype=np.int64))
+        tracks_max = max(tracks_max, int(np.max(tracks)))
+    
+    energy_mean = energy_sum / n_events
+    energy_std = np.sqrt(max(energy_sumsq / n_events - energy_mean ** 2, 0.0))
+    tracks_mean = tracks_sum / n_events
     
-    # Statistics
     print("\n" + "=" * 60)
     print("Statistics")
     print("=" * 60)
-    print(f"Mean Energy Deposited: {np.mean(energy_deposited):.4f} MeV")
-    print(f"Std Energy Deposited: {np.std(energy_deposited):.4f} MeV")
-    print(f"Min Energy Deposited: {np.min(energy_deposited):.4f} MeV")
-    print(f"Max Energy Deposited: {np.max(energy_deposited):.4f} MeV")
+    print(f"Mean Energy Deposited: {energy_mean:.4f} MeV")
+    print(f"Std Energy Deposited: {energy_std:.4f} MeV")
+    print(f"Min Energy Deposited: {energy_min:.4f} MeV")
+    print(f"Max Energy Deposited: {energy_max:.4f} MeV")
     
     # Create plots
     print("\n" + "=" * 60)
@@ -57,91 +113,130 @@ with uproot.open("output/simulation_results.root") as f:
     output_dir = Path("output/plots")
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Plot 1: Energy Deposition Distribution
-    plt.figure(figsize=(10, 6))
-    plt.hist(energy_deposited, bins=30, alpha=0.7, color='blue', edgecolor='black')
-    plt.xlabel('Energy Deposited (MeV)', fontsize=12)
-    plt.ylabel('Number of Events', fontsize=12)
-    plt.title('Energy Deposition Distribution', fontsize=14, fontweight='bold')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plot1 = output_dir / "energy_deposition_hist.png"
-    plt.savefig(plot1, dpi=150)
-    plt.close()
+    # Fixed bin edges so per-chunk histogram counts can simply be summed
+    energy_edges = np.histogram_bin_edges([energy_min, energy_max], bins=30)
+    tracks_edges = np.arange(0, tracks_max + 2)
+    energy_counts = np.zeros(len(energy_edges) - 1, dtype=np.int64)
+    tracks_counts = np.zeros(len(tracks_edges) - 1, dtype=np.int64)
+    
+    # Per-event plots are drawn chunk by chunk while the histograms accumulate.
+    # The 10x6 figure is reused for the histograms once its scatter is saved.
+    fig, ax = plt.subplots(figsize=(10, 6))
+    fig_line, ax_line = plt.subplots(figsize=(12, 6))
+    fig_cum, ax_cum = plt.subplots(figsize=(12, 6))
+    fig_dash, axes = plt.subplots(2, 2, figsize=(14, 10))
+    
+    # Pass 2: histograms and per-event series
+    last_event = None
+    last_energy = None
+    cumulative_offset = 0.0
+    cumulative_buf = np.empty(0, dtype=np.float64)  # Reused across chunks
+    for chunk in iter_columns(tree, columns, step_size):
+        event_id = chunk["event_id"]
+        truth_energy = chunk["truth_energy"]
+        energy = chunk["energy_deposited"]
+        tracks = chunk["tracks_created"]
+        if len(energy) == 0:
+            continue
+        
+        energy_counts += histogram(energy, energy_edges)[0]
+        tracks_counts += histogram(tracks, tracks_edges)[0]
+        
+        ax.scatter(truth_energy, energy, alpha=0.5, s=20, color='C0', rasterized=True)
+        axes[0, 1].scatter(event_id, energy, alpha=0.5, s=10, color='C0', rasterized=True)
+        
+        # Carry the previous chunk's last point so the lines stay continuous
+        # (slot 0 of the cumulative buffer holds the previous running total)
+        n = len(energy)
+        if len(cumulative_buf) < n + 1:
+            cumulative_buf = np.empty(n + 1, dtype=np.float64)
+        cumulative_buf[0] = cumulative_offset
+        cumulative_energy = cumulative_buf[1:n + 1]
+        np.cumsum(energy, dtype=np.float64, out=cumulative_energy)
+        cumulative_energy += cumulative_offset
+        if last_event is None:
+            line_x, line_y, cum_y = event_id, energy, cumulative_energy
+        else:
+            line_x = np.concatenate(([last_event], event_id))
+            line_y = np.concatenate(([last_energy], energy))
+            cum_y = cumulative_buf[:n + 1]
+        ax_line.plot(line_x, line_y, marker='o', markersize=3, linestyle='-', alpha=0.6, color='C0')
+        ax_cum.plot(line_x, cum_y, linewidth=2, color='red')
+        last_event = event_id[-1]
+        last_energy = energy[-1]
+        cumulative_offset = float(cumulative_energy[-1])
+    
+    # Plot 1: Truth Energy vs Deposited Energy
+    ax.set_xlabel('Truth Energy (MeV)', fontsize=12)
+    ax.set_ylabel('Energy Deposited (MeV)', fontsize=12)
+    ax.set_title('Truth Energy vs Deposited Energy', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    plot1 = output_dir / "truth_vs_deposited.png"
+    fig.savefig(plot1)
     print(f"✓ Saved: {plot1}")
     
-    # Plot 2: Truth Energy vs Deposited Energy
-    plt.figure(figsize=(10, 6))
-    plt.scatter(truth_energy, energy_deposited, alpha=0.5, s=20)
-    plt.xlabel('Truth Energy (MeV)', fontsize=12)
-    plt.ylabel('Energy Deposited (MeV)', fontsize=12)
-    plt.title('Truth Energy vs Deposited Energy', fontsize=14, fontweight='bold')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    plot2 = output_dir / "truth_vs_deposited.png"
-    plt.savefig(plot2, dpi=150)
-    plt.close()
+    # Plot 2: Energy Deposition Distribution
+    ax.clear()
+    ax.bar(energy_edges[:-1], energy_counts, width=np.diff(energy_edges), align='edge', alpha=0.7, color='blue', edgecolor='black')
+    ax.set_xlabel('Energy Deposited (MeV)', fontsize=12)
+    ax.set_ylabel('Number of Events', fontsize=12)
+    ax.set_title('Energy Deposition Distribution', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    plot2 = output_dir / "energy_deposition_hist.png"
+    fig.savefig(plot2)
     print(f"✓ Saved: {plot2}")
     
     # Plot 3: Number of Tracks Distribution
-    plt.figure(figsize=(10, 6))
-    plt.hist(tracks, bins=range(0, int(np.max(tracks))+2), alpha=0.7, color='green', edgecolor='black')
-    plt.xlabel('Number of Tracks Created', fontsize=12)
-    plt.ylabel('Number of Events', fontsize=12)
-    plt.title('Secondary Tracks Distribution', fontsize=14, fontweight='bold')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
+    ax.clear()
+    ax.bar(tracks_edges[:-1], tracks_counts, width=np.diff(tracks_edges), align='edge', alpha=0.7, color='green', edgecolor='black')
+    ax.set_xlabel('Number of Tracks Created', fontsize=12)
+    ax.set_ylabel('Number of Events', fontsize=12)
+    ax.set_title('Secondary Tracks Distribution', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
     plot3 = output_dir / "tracks_distribution.png"
-    plt.savefig(plot3, dpi=150)
-    plt.close()
+    fig.savefig(plot3)
     print(f"✓ Saved: {plot3}")
     
     # Plot 4: Event-by-event Energy Deposition
-    plt.figure(figsize=(12, 6))
-    plt.plot(event_id, energy_deposited, marker='o', markersize=3, linestyle='-', alpha=0.6)
-    plt.xlabel('Event ID', fontsize=12)
-    plt.ylabel('Energy Deposited (MeV)', fontsize=12)
-    plt.title('Energy Deposition per Event', fontsize=14, fontweight='bold')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
+    ax_line.set_xlabel('Event ID', fontsize=12)
+    ax_line.set_ylabel('Energy Deposited (MeV)', fontsize=12)
+    ax_line.set_title('Energy Deposition per Event', fontsize=14, fontweight='bold')
+    ax_line.grid(True, alpha=0.3)
+    fig_line.tight_layout()
     plot4 = output_dir / "energy_vs_event.png"
-    plt.savefig(plot4, dpi=150)
-    plt.close()
+    fig_line.savefig(plot4)
     print(f"✓ Saved: {plot4}")
     
     # Plot 5: Cumulative Energy Deposition
-    cumulative_energy = np.cumsum(energy_deposited)
-    plt.figure(figsize=(12, 6))
-    plt.plot(event_id, cumulative_energy, linewidth=2, color='red')
-    plt.xlabel('Event ID', fontsize=12)
-    plt.ylabel('Cumulative Energy Deposited (MeV)', fontsize=12)
-    plt.title('Cumulative Energy Deposition', fontsize=14, fontweight='bold')
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
+    ax_cum.set_xlabel('Event ID', fontsize=12)
+    ax_cum.set_ylabel('Cumulative Energy Deposited (MeV)', fontsize=12)
+    ax_cum.set_title('Cumulative Energy Deposition', fontsize=14, fontweight='bold')
+    ax_cum.grid(True, alpha=0.3)
+    fig_cum.tight_layout()
     plot5 = output_dir / "cumulative_energy.png"
-    plt.savefig(plot5, dpi=150)
-    plt.close()
+    fig_cum.savefig(plot5)
     print(f"✓ Saved: {plot5}")
     
     # Plot 6: Summary Dashboard
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     
     # Histogram
-    axes[0, 0].hist(energy_deposited, bins=30, alpha=0.7, color='blue', edgecolor='black')
+    axes[0, 0].bar(energy_edges[:-1], energy_counts, width=np.diff(energy_edges), align='edge', alpha=0.7, color='blue', edgecolor='black')
     axes[0, 0].set_xlabel('Energy Deposited (MeV)')
     axes[0, 0].set_ylabel('Events')
     axes[0, 0].set_title('Energy Distribution')
     axes[0, 0].grid(True, alpha=0.3)
     
     # Scatter
-    axes[0, 1].scatter(event_id, energy_deposited, alpha=0.5, s=10)
     axes[0, 1].set_xlabel('Event ID')
     axes[0, 1].set_ylabel('Energy Deposited (MeV)')
     axes[0, 1].set_title('Energy per Event')
     axes[0, 1].grid(True, alpha=0.3)
     
     # Tracks
-    axes[1, 0].hist(tracks, bins=range(0, int(np.max(tracks))+2), alpha=0.7, color='green', edgecolor='black')
+    axes[1, 0].bar(tracks_edges[:-1], tracks_counts, width=np.diff(tracks_edges), align='edge', alpha=0.7, color='green', edgecolor='black')
     axes[1, 0].set_xlabel('Tracks Created')
     axes[1, 0].set_ylabel('Events')
     axes[1, 0].set_title('Secondary Tracks')
@@ -150,27 +245,39 @@ with uproot.open("output/simulation_results.root") as f:
     # Stats text
     stats_text = f"""Statistics Summary
     
-Total Events: {len(event_id)}
-Mean Energy: {np.mean(energy_deposited):.4f} MeV
-Std Dev: {np.std(energy_deposited):.4f} MeV
-Min: {np.min(energy_deposited):.4f} MeV
-Max: {np.max(energy_deposited):.4f} MeV
+Total Events: {n_events}
+Mean Energy: {energy_mean:.4f} MeV
+Std Dev: {energy_std:.4f} MeV
+Min: {energy_min:.4f} MeV
+Max: {energy_max:.4f} MeV
 
-Total Deposited: {np.sum(energy_deposited):.2f} MeV
-Mean Tracks: {np.mean(tracks):.1f}"""
+Total Deposited: {energy_sum:.2f} MeV
+Mean Tracks: {tracks_mean:.1f}"""
     
     axes[1, 1].text(0.1, 0.5, stats_text, fontsize=11, family='monospace', 
                     verticalalignment='center', transform=axes[1, 1].transAxes)
     axes[1, 1].axis('off')
     
-    plt.suptitle('GEANT4 Simulation Summary', fontsize=16, fontweight='bold')
-    plt.tight_layout()
+    fig_dash.suptitle('GEANT4 Simulation Summary', fontsize=16, fontweight='bold')
+    fig_dash.tight_layout()
     plot6 = output_dir / "summary_dashboard.png"
-    plt.savefig(plot6, dpi=150)
-    plt.close()
+    fig_dash.savefig(plot6)
     print(f"✓ Saved: {plot6}")
+    plt.close('all')
     
     print(f"\nAll plots saved to: {output_dir}/")
     print("Plot files:")
     for plot_file in sorted(output_dir.glob("*.png")):
         print(f"  - {plot_file.name}")
+
+
+def main():
+    # The array cache keeps decompressed branch data for repeat arrays() reads
+    # while the file stays open, e.g. when inspect_file() is called again.
+    # The local file is memory-mapped rather than read with per-request preads.
+    with uproot.open(ROOT_FILE, array_cache="1 GB", handler=uproot.MemmapSource) as f:
+        inspect_file(f)
+
+
+if __name__ == "__main__":
+    main()
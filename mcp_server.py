@@ -5,17 +5,83 @@ Provides tools for Claude Desktop to control and run GEANT4 simulations
 """
 
 import asyncio
+import base64
+import inspect
 import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any
+from typing import Any, Awaitable, Callable
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
-from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
+from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource, BlobResourceContents
 from pydantic import AnyUrl
+import numpy as np
+import uproot
+
+# Figures are rendered by the plotting module in worker processes. Without
+# matplotlib the server still runs, it just does not offer create_plots
+try:
+    import plotting
+except ImportError:
+    plotting = None
 
 # Import simulation
-from simulation import Geant4Simulation, SimulationConfig
+from simulation import Geant4Simulation, SimulationConfig, json_doc
+
+# Optional: orjson serializes responses much faster than the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: pyarrow enables binary Arrow IPC event payloads
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Optional: fastjsonschema compiles the tool input schemas into validators
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+
+def _dumps(obj, pretty=True, sort_keys=False):
+    """Serialize obj as JSON text, using orjson when available
+    
+    Indented output is for replies a person reads; large programmatic
+    payloads pass pretty=False to get compact separators instead.
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option).decode()
+    if pretty:
+        return json.dumps(obj, indent=2, sort_keys=sort_keys)
+    return json.dumps(obj, separators=(",", ":"), sort_keys=sort_keys)
+
+
+def _loads(data):
+    """Parse JSON text or bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _text(msg):
+    """Single-item text reply
+    
+    The server builds these from trusted strings, so model_construct skips
+    pydantic validation of the outgoing TextContent.
+    """
+    return [TextContent.model_construct(type="text", text=msg)]
+
 
 # Create MCP server
 app = Server("geant4-simulation-server")
@@ -24,501 +90,593 @@ app = Server("geant4-simulation-server")
 current_simulation = None
 current_config = SimulationConfig()
 
+# Serializes run_simulation calls, which share current_simulation and its
+# output files; readers of the results or the ROOT file take it too, so they
+# never see a run or a save halfway through
+_RUN_LOCK = asyncio.Lock()
 
-@app.list_tools()
-async def handle_list_tools() -> list[Tool]:
-    """List available tools for the MCP server"""
-    return [
-        Tool(
-            name="configure_simulation",
-            description=(
-                "Configure the GEANT4 simulation parameters including particle type, "
-                "energy, detector dimensions, and material. Returns the current configuration."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "particle_type": {
-                        "type": "string",
-                        "description": "Particle type (gamma, e-, e+, proton, neutron, etc.)",
-                        "default": "gamma"
-                    },
-                    "particle_energy": {
-                        "type": "number",
-                        "description": "Particle energy in MeV",
-                        "default": 1.0
-                    },
-                    "particle_position": {
-                        "type": "array",
-                        "items": {"type": "number"},
-                        "description": "Particle initial position [x, y, z] in cm",
-                        "default": [0.0, 0.0, -10.0]
-                    },
-                    "particle_direction": {
-                        "type": "array",
-                        "items": {"type": "number"},
-                        "description": "Particle direction unit vector [x, y, z]",
-                        "default": [0.0, 0.0, 1.0]
-                    },
-                    "cube_size_x": {
-                        "type": "number",
-                        "description": "Detector cube size in X dimension (cm)",
-                        "default": 10.0
-                    },
-                    "cube_size_y": {
-                        "type": "number",
-                        "description": "Detector cube size in Y dimension (cm)",
-                        "default": 10.0
-                    },
-                    "cube_size_z": {
-                        "type": "number",
-                        "description": "Detector cube size in Z dimension (cm)",
-                        "default": 10.0
-                    },
-                    "cube_material": {
-                        "type": "string",
-                        "description": "Detector material (G4_WATER, G4_Al, G4_Pb, etc.)",
-                        "default": "G4_WATER"
-                    },
-                    "num_events": {
-                        "type": "integer",
-                        "description": "Number of events to simulate",
-                        "default": 100
-                    }
-                }
-            }
+# Serializes create_plots calls, which all write the same PNG files
+_PLOT_LOCK = asyncio.Lock()
+
+# Process pool for figure rendering, created on the first create_plots call
+_PLOT_POOL = None
+
+# Last create_plots reply, keyed by (resolved path, st_mtime_ns, st_size) of
+# its ROOT file. Holds one entry: the PNGs on disk belong to the last render
+_PLOT_CACHE = {}
+
+# PNG files written by create_plots, in reply order
+_PLOT_DIR = Path("output/plots")
+_PLOT_FILES = (
+    "energy_deposition_hist.png",
+    "energy_vs_event.png",
+    "tracks_distribution.png",
+    "summary_dashboard.png",
+)
+
+# Constant heads of the success replies; the handlers append the dynamic part
+_CFG_UPDATED_PREFIX = "Configuration updated successfully:\n"
+_RUN_DONE_PREFIX = "Simulation completed successfully!\n"
+_CFG_SAVED_PREFIX = "Configuration saved to "
+_CFG_LOADED_PREFIX = "Configuration loaded from "
+_PNG_DATA_URI = "](data:image/png;base64,"
+
+# Serialized config the current simulation was initialized with; when it is
+# unchanged, run_simulation reuses the simulation instead of re-initializing
+last_init_key = None
+
+
+# The tool list is static, so build it once at import time
+_TOOLS_CACHE = [
+    Tool(
+        name="configure_simulation",
+        description=(
+            "Configure the GEANT4 simulation parameters including particle type, "
+            "energy, detector dimensions, and material. Returns the current configuration."
         ),
-        Tool(
-            name="run_simulation",
-            description=(
-                "Run the GEANT4 simulation with the current configuration. "
-                "Returns summary of results including energy deposition."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "num_events": {
-                        "type": "integer",
-                        "description": "Number of events to run (overrides config if provided)"
-                    }
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "particle_type": {
+                    "type": "string",
+                    "description": "Particle type (gamma, e-, e+, proton, neutron, etc.)",
+                    "default": "gamma"
+                },
+                "particle_energy": {
+                    "type": "number",
+                    "description": "Particle energy in MeV",
+                    "default": 1.0
+                },
+                "particle_position": {
+                    "type": "array",
+                    "items": {"type": "number"},
+                    "description": "Particle initial position [x, y, z] in cm",
+                    "default": [0.0, 0.0, -10.0]
+                },
+                "particle_direction": {
+                    "type": "array",
+                    "items": {"type": "number"},
+                    "description": "Particle direction unit vector [x, y, z]",
+                    "default": [0.0, 0.0, 1.0]
+                },
+                "cube_size_x": {
+                    "type": "number",
+                    "description": "Detector cube size in X dimension (cm)",
+                    "default": 10.0
+                },
+                "cube_size_y": {
+                    "type": "number",
+                    "description": "Detector cube size in Y dimension (cm)",
+                    "default": 10.0
+                },
+                "cube_size_z": {
+                    "type": "number",
+                    "description": "Detector cube size in Z dimension (cm)",
+                    "default": 10.0
+                },
+                "cube_material": {
+                    "type": "string",
+                    "description": "Detector material (G4_WATER, G4_Al, G4_Pb, etc.)",
+                    "default": "G4_WATER"
+                },
+                "num_events": {
+                    "type": "integer",
+                    "description": "Number of events to simulate",
+                    "default": 100
                 }
             }
+        }
+    ),
+    Tool(
+        name="run_simulation",
+        description=(
+            "Run the GEANT4 simulation with the current configuration. "
+            "Returns summary of results including energy deposition."
         ),
-        Tool(
-            name="get_simulation_status",
-            description="Get the current simulation configuration and status",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        ),
-        Tool(
-            name="get_results",
-            description=(
-                "Get detailed results from the last simulation run, "
-                "including event-by-event data and summary statistics"
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "include_events": {
-                        "type": "boolean",
-                        "description": "Include detailed event data (default: false)",
-                        "default": False
-                    }
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "num_events": {
+                    "type": "integer",
+                    "description": "Number of events to run (overrides config if provided)"
                 }
             }
+        }
+    ),
+    Tool(
+        name="get_simulation_status",
+        description="Get the current simulation configuration and status",
+        inputSchema={
+            "type": "object",
+            "properties": {}
+        }
+    ),
+    Tool(
+        name="get_results",
+        description=(
+            "Get detailed results from the last simulation run, "
+            "including event-by-event data and summary statistics"
         ),
-        Tool(
-            name="save_configuration",
-            description="Save the current simulation configuration to a file",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "Filename to save configuration (default: config.json)"
-                    }
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "include_events": {
+                    "type": "boolean",
+                    "description": "Include detailed event data (default: false)",
+                    "default": False
+                },
+                "events_format": {
+                    "type": "string",
+                    "enum": ["json", "arrow"],
+                    "description": (
+                        "Encoding for included events: inline JSON, or a columnar "
+                        "Arrow IPC stream resource (requires pyarrow; default: json)"
+                    ),
+                    "default": "json"
                 }
             }
-        ),
-        Tool(
-            name="load_configuration",
-            description="Load simulation configuration from a file",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "Filename to load configuration from"
-                    }
-                },
-                "required": ["filename"]
+        }
+    ),
+    Tool(
+        name="save_configuration",
+        description="Save the current simulation configuration to a file",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "filename": {
+                    "type": "string",
+                    "description": "Filename to save configuration (default: config.json)"
+                }
             }
+        }
+    ),
+    Tool(
+        name="load_configuration",
+        description="Load simulation configuration from a file",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "filename": {
+                    "type": "string",
+                    "description": "Filename to load configuration from"
+                }
+            },
+            "required": ["filename"]
+        }
+    ),
+    Tool(
+        name="create_plots",
+        description=(
+            "Create plots from the ROOT file simulation results. "
+            "Generates multiple plots including energy deposition histograms, "
+            "scatter plots, and summary dashboards. Returns image paths."
         ),
-        Tool(
-            name="create_plots",
-            description=(
-                "Create plots from the ROOT file simulation results. "
-                "Generates multiple plots including energy deposition histograms, "
-                "scatter plots, and summary dashboards. Returns image paths."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "root_file": {
-                        "type": "string",
-                        "description": "Path to ROOT file (default: output/simulation_results.root)",
-                        "default": "output/simulation_results.root"
-                    }
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "root_file": {
+                    "type": "string",
+                    "description": "Path to ROOT file (default: output/simulation_results.root)",
+                    "default": "output/simulation_results.root"
                 }
             }
-        )
-    ]
+        }
+    )
+]
 
+if plotting is None:
+    _TOOLS_CACHE = [tool for tool in _TOOLS_CACHE if tool.name != "create_plots"]
 
-@app.call_tool()
-async def handle_call_tool(name: str, arguments: dict | None) -> list[TextContent | ImageContent | EmbeddedResource]:
-    """Handle tool calls from Claude"""
-    global current_simulation, current_config
+_SCHEMAS = {tool.name: tool.inputSchema for tool in _TOOLS_CACHE}
+
+# Argument validators compiled once from the tool input schemas. Defaults are
+# not injected: configure_simulation must only touch the fields it was given.
+if fastjsonschema is not None:
+    _VALIDATORS = {
+        name: fastjsonschema.compile(schema, use_default=False)
+        for name, schema in _SCHEMAS.items()
+    }
+else:
+    _VALIDATORS = {}
+
+# Config fields configure_simulation may set (its schema properties)
+_CONFIG_FIELDS = frozenset(_SCHEMAS["configure_simulation"]["properties"])
+
+
+# Content items of one tool reply, as returned by every tool handler
+_ToolResult = list[TextContent | ImageContent | EmbeddedResource]
+
+
+@app.list_tools()
+async def handle_list_tools() -> list[Tool]:
+    """List available tools for the MCP server"""
+    return _TOOLS_CACHE
+
+
+async def _configure_simulation(arguments: dict) -> _ToolResult:
+    """Update the current configuration from the tool arguments"""
+    # A run in progress reads this same config object from its worker
+    # thread, so wait for it rather than change the settings under it
+    async with _RUN_LOCK:
+        # Update configuration
+        for key, value in arguments.items():
+            if key in _CONFIG_FIELDS:
+                setattr(current_config, key, value)
+        
+        config_dict = current_config.to_dict()
+    return _text(_CFG_UPDATED_PREFIX + _dumps(config_dict))
+
+
+def _run_sim(simulation, num_events, initialize):
+    """Blocking simulation pipeline; runs in a worker thread"""
+    if initialize:
+        simulation.initialize()
+    simulation.run(num_events)
+    simulation.save_results()
+    return simulation.get_summary()
+
+
+async def _run_simulation(arguments: dict) -> _ToolResult:
+    """Run the simulation with the current configuration and save the results"""
+    global current_simulation, last_init_key
     
-    if arguments is None:
-        arguments = {}
+    async with _RUN_LOCK:
+        # Geometry/physics setup is the expensive part; only redo it when
+        # the configuration changed since the last initialization
+        init_key = _dumps(current_config.to_dict(), pretty=False, sort_keys=True)
+        needs_init = (current_simulation is None
+                      or current_simulation.config is not current_config
+                      or init_key != last_init_key)
+        if needs_init:
+            current_simulation = Geant4Simulation(current_config)
+            last_init_key = None
+        else:
+            current_simulation.reset()
+        
+        # Initialize/run/save in a worker thread so the event loop keeps
+        # serving other tool calls, e.g. status polls, meanwhile
+        num_events = arguments.get("num_events", current_config.num_events)
+        summary = await asyncio.to_thread(_run_sim, current_simulation, num_events, needs_init)
+        last_init_key = init_key
     
-    try:
-        if name == "configure_simulation":
-            # Update configuration
-            if "particle_type" in arguments:
-                current_config.particle_type = arguments["particle_type"]
-            if "particle_energy" in arguments:
-                current_config.particle_energy = arguments["particle_energy"]
-            if "particle_position" in arguments:
-                current_config.particle_position = arguments["particle_position"]
-            if "particle_direction" in arguments:
-                current_config.particle_direction = arguments["particle_direction"]
-            if "cube_size_x" in arguments:
-                current_config.cube_size_x = arguments["cube_size_x"]
-            if "cube_size_y" in arguments:
-                current_config.cube_size_y = arguments["cube_size_y"]
-            if "cube_size_z" in arguments:
-                current_config.cube_size_z = arguments["cube_size_z"]
-            if "cube_material" in arguments:
-                current_config.cube_material = arguments["cube_material"]
-            if "num_events" in arguments:
-                current_config.num_events = arguments["num_events"]
-            
-            config_dict = current_config.to_dict()
-            return [
-                TextContent(
-                    type="text",
-                    text=f"Configuration updated successfully:\n{json.dumps(config_dict, indent=2)}"
-                )
-            ]
+    return _text(_RUN_DONE_PREFIX + summary)
+
+
+async def _get_simulation_status(arguments: dict) -> _ToolResult:
+    """Report the current configuration and whether results are available"""
+    status = {
+        "configuration": current_config.to_dict(),
+        "simulation_run": current_simulation is not None,
+        "results_available": current_simulation is not None and current_simulation.num_results > 0
+    }
+    
+    return _text(_dumps(status))
+
+
+async def _get_results(arguments: dict) -> _ToolResult:
+    """Return the summary (and optionally the events) of the last run"""
+    # A run in progress is still filling and saving the events, so wait for it
+    async with _RUN_LOCK:
+        if current_simulation is None or not current_simulation.num_results:
+            return _text("No simulation results available. Run a simulation first.")
         
-        elif name == "run_simulation":
-            # Create new simulation with current config
-            current_simulation = Geant4Simulation(current_config)
-            current_simulation.initialize()
-            
-            # Run simulation
-            num_events = arguments.get("num_events", current_config.num_events)
-            current_simulation.run(num_events)
-            
-            # Save results
-            current_simulation.save_results()
-            
-            # Get summary
-            summary = current_simulation.get_summary()
-            
-            return [
-                TextContent(
-                    type="text",
-                    text=f"Simulation completed successfully!\n{summary}"
-                )
-            ]
+        include_events = arguments.get("include_events", False)
+        events_format = arguments.get("events_format", "json")
         
-        elif name == "get_simulation_status":
-            status = {
-                "configuration": current_config.to_dict(),
-                "simulation_run": current_simulation is not None,
-                "results_available": current_simulation is not None and len(current_simulation.results) > 0
-            }
-            
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps(status, indent=2)
-                )
-            ]
+        # Totals come from the simulation's cached column reduction; per-event
+        # dicts are only built below when the events themselves were asked for
+        total_events, total_energy, avg_energy = current_simulation.energy_summary()
         
-        elif name == "get_results":
-            if current_simulation is None or not current_simulation.results:
-                return [
-                    TextContent(
-                        type="text",
-                        text="No simulation results available. Run a simulation first."
-                    )
-                ]
-            
-            include_events = arguments.get("include_events", False)
-            
-            results = {
-                "summary": {
-                    "total_events": len(current_simulation.results),
-                    "total_energy_deposited_MeV": sum(r["energy_deposited_MeV"] for r in current_simulation.results),
-                    "avg_energy_deposited_MeV": sum(r["energy_deposited_MeV"] for r in current_simulation.results) / len(current_simulation.results)
-                }
+        results = {
+            "summary": {
+                "total_events": total_events,
+                "total_energy_deposited_MeV": total_energy,
+                "avg_energy_deposited_MeV": avg_energy
             }
-            
-            if include_events:
-                results["events"] = current_simulation.results
-            
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps(results, indent=2)
-                )
-            ]
-        
-        elif name == "save_configuration":
-            filename = arguments.get("filename", "config.json")
-            filepath = Path(filename)
-            
-            # Ensure directory exists
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Save configuration
-            with open(filepath, 'w') as f:
-                json.dump(current_config.to_dict(), f, indent=2)
-            
-            return [
-                TextContent(
-                    type="text",
-                    text=f"Configuration saved to {filepath}"
-                )
-            ]
+        }
         
-        elif name == "load_configuration":
-            filename = arguments["filename"]
-            filepath = Path(filename)
-            
-            if not filepath.exists():
-                return [
-                    TextContent(
-                        type="text",
-                        text=f"Configuration file not found: {filepath}"
+        if include_events and events_format == "arrow" and pa is not None:
+            # Columnar binary payload: one buffer per branch instead of a dict per event
+            table = current_simulation.event_table()
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            
+            return _text(_dumps(results)) + [
+                EmbeddedResource(
+                    type="resource",
+                    resource=BlobResourceContents(
+                        uri=AnyUrl("geant4://results/events.arrow"),
+                        mimeType="application/vnd.apache.arrow.stream",
+                        blob=base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii")
                     )
-                ]
-            
-            # Load configuration
-            with open(filepath, 'r') as f:
-                config_data = json.load(f)
-            
-            current_config = SimulationConfig.from_dict(config_data)
-            
-            return [
-                TextContent(
-                    type="text",
-                    text=f"Configuration loaded from {filepath}:\n{json.dumps(current_config.to_dict(), indent=2)}"
                 )
             ]
         
-        elif name == "create_plots":
-            import os
-            import warnings
-            warnings.filterwarnings('ignore')
-            os.environ['MPLBACKEND'] = 'Agg'
-            
-            import uproot
-            import numpy as np
-            import matplotlib
-            matplotlib.use('Agg', force=True)
-            import matplotlib.pyplot as plt
-            import base64
-            
-            import logging
-            logging.getLogger('matplotlib').setLevel(logging.CRITICAL)
-            plt.ioff()
-            
-            root_file = arguments.get("root_file", "output/simulation_results.root")
-            
-            if not Path(root_file).exists():
-                return [
-                    TextContent(
-                        type="text",
-                        text=f"ROOT file not found: {root_file}. Run a simulation first."
-                    )
-                ]
-            
-            # Read ROOT file
-            with uproot.open(root_file) as f:
-                tree = f["events"]
-                energy_deposited = tree["energy_deposited"].array()
-                truth_energy = tree["truth_energy"].array()
-                tracks = tree["tracks_created"].array()
-                event_id = tree["event_id"].array()
-                interactions = tree["interactions"].array()
-            
-            # Create output directory
-            output_dir = Path("output/plots")
-            output_dir.mkdir(parents=True, exist_ok=True)
-            
-            results = []
-            
-            # Add statistics text first
-            stats_text = f"""📊 GEANT4 Simulation Results Analysis
+        if include_events:
+            if events_format == "arrow":
+                # Only reached without pyarrow; say so rather than silently switching
+                results["events_format"] = "json"
+                results["note"] = "Arrow events need pyarrow, which is not installed; events are inline JSON instead"
+            results["primary_template"] = current_simulation.primary_template
+            results["events"] = current_simulation.results
+        
+        return _text(_dumps(results, pretty=not include_events))
+
+
+async def _save_configuration(arguments: dict) -> _ToolResult:
+    """Save the current configuration to a JSON file"""
+    filename = arguments.get("filename", "config.json")
+    filepath = Path(filename)
+    
+    # Ensure directory exists
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Save configuration
+    await asyncio.to_thread(filepath.write_bytes, json_doc(current_config.to_dict()))
+    
+    return _text(_CFG_SAVED_PREFIX + str(filepath))
+
+
+async def _load_configuration(arguments: dict) -> _ToolResult:
+    """Load the current configuration from a JSON file"""
+    global current_config
+    
+    filename = arguments["filename"]
+    filepath = Path(filename)
+    
+    # Load configuration; a missing file surfaces from the read itself
+    try:
+        raw = await asyncio.to_thread(filepath.read_bytes)
+    except FileNotFoundError:
+        return _text(f"Configuration file not found: {filepath}")
+    config_data = _loads(raw)
+    
+    current_config = SimulationConfig.from_dict(config_data)
+    
+    return _text("".join((_CFG_LOADED_PREFIX, str(filepath), ":\n", _dumps(current_config.to_dict()))))
+
+
+def _plot_pool():
+    """Worker processes for rendering, started on first use and then reused"""
+    global _PLOT_POOL
+    if _PLOT_POOL is None:
+        _PLOT_POOL = ProcessPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=plotting.worker_init,
+        )
+    return _PLOT_POOL
+
+
+def _discard_plot_pool():
+    """Drop a pool that lost a worker, so the next _plot_pool() starts afresh"""
+    global _PLOT_POOL
+    if _PLOT_POOL is not None:
+        _PLOT_POOL.shutdown(wait=False, cancel_futures=True)
+        _PLOT_POOL = None
+
+
+async def _render(jobs):
+    """Run (function, args) render jobs on the plot pool; returns their results
+    
+    A worker that died (OOM, a crash in Agg) breaks the whole pool, so the
+    jobs are retried once on a new one.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in (1, 2):
+        try:
+            futures = [loop.run_in_executor(_plot_pool(), func, *args) for func, args in jobs]
+            results = await asyncio.gather(*futures, return_exceptions=True)
+            for r in results:
+                if isinstance(r, BaseException):
+                    raise r
+            return results
+        except BrokenProcessPool:
+            _discard_plot_pool()
+            if attempt == 2:
+                raise
+
+
+def _load_plot_data(root_file):
+    """Read the ROOT file and compute histograms and statistics (blocking)"""
+    # Read ROOT file: only the branches that are plotted, in one call
+    with uproot.open(root_file) as f:
+        data = f["events"].arrays(
+            ["event_id", "energy_deposited", "tracks_created", "interactions"],
+            library="np",
+        )
+    event_id = data["event_id"]
+    energy_deposited = data["energy_deposited"]
+    tracks = data["tracks_created"]
+    interactions = data["interactions"]
+    
+    # Bin once; the standalone plots and the dashboard share the counts.
+    # Track counts are small non-negative integers, so one bincount pass gives
+    # the unit-width histogram over 0..max without a separate max scan
+    energy_counts, energy_edges = plotting.histogram(energy_deposited, 30)
+    tracks_counts = np.bincount(tracks.astype(np.intp, copy=False))
+    tracks_edges = np.arange(len(tracks_counts) + 1)
+    
+    # Summary statistics in as few passes as possible; the header text and
+    # the dashboard box both format these. std comes from the sum of squares
+    energy = np.ascontiguousarray(energy_deposited, dtype=np.float64)
+    n_events = len(event_id)
+    e_sum = float(energy.sum())
+    e_mean = e_sum / n_events
+    e_std = float(np.sqrt(max(np.dot(energy, energy) / n_events - e_mean * e_mean, 0.0)))
+    e_min = float(energy.min())
+    e_max = float(energy.max())
+    tracks_mean = float(tracks.mean())
+    interactions_mean = float(interactions.mean())
+    
+    stats_text = f"""📊 GEANT4 Simulation Results Analysis
 
 📈 Statistics Summary:
-  • Total Events: {len(event_id)}
-  • Mean Energy Deposited: {np.mean(energy_deposited):.4f} MeV
-  • Std Dev: {np.std(energy_deposited):.4f} MeV
-  • Min Energy: {np.min(energy_deposited):.4f} MeV
-  • Max Energy: {np.max(energy_deposited):.4f} MeV
-  • Total Energy Deposited: {np.sum(energy_deposited):.2f} MeV
-  • Mean Tracks Created: {np.mean(tracks):.1f}
-  • Mean Interactions: {np.mean(interactions):.1f}
+  • Total Events: {n_events}
+  • Mean Energy Deposited: {e_mean:.4f} MeV
+  • Std Dev: {e_std:.4f} MeV
+  • Min Energy: {e_min:.4f} MeV
+  • Max Energy: {e_max:.4f} MeV
+  • Total Energy Deposited: {e_sum:.2f} MeV
+  • Mean Tracks Created: {tracks_mean:.1f}
+  • Mean Interactions: {interactions_mean:.1f}
 
 Generated plots are shown below:
 """
-            results.append(TextContent(type="text", text=stats_text))
-            
-            # Plot 1: Energy Deposition Histogram
-            plt.figure(figsize=(10, 6))
-            plt.hist(energy_deposited, bins=30, alpha=0.7, color='blue', edgecolor='black')
-            plt.xlabel('Energy Deposited (MeV)', fontsize=12)
-            plt.ylabel('Number of Events', fontsize=12)
-            plt.title('Energy Deposition Distribution', fontsize=14, fontweight='bold')
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            plot1_path = output_dir / "energy_deposition_hist.png"
-            plt.savefig(plot1_path, dpi=150, bbox_inches='tight')
-            plt.close()
-            
-            with open(plot1_path, 'rb') as img_file:
-                img_data = base64.b64encode(img_file.read()).decode('utf-8')
-            
-            # Return as embedded resource with data URI
-            results.append(TextContent(
-                type="text",
-                text=f"![Energy Deposition Histogram](data:image/png;base64,{img_data})"
-            ))
-            
-            # Plot 2: Event-by-Event Energy
-            plt.figure(figsize=(12, 6))
-            plt.plot(event_id, energy_deposited, marker='o', markersize=3, linestyle='-', alpha=0.6, color='steelblue')
-            plt.xlabel('Event ID', fontsize=12)
-            plt.ylabel('Energy Deposited (MeV)', fontsize=12)
-            plt.title('Energy Deposition per Event', fontsize=14, fontweight='bold')
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            plot2_path = output_dir / "energy_vs_event.png"
-            plt.savefig(plot2_path, dpi=150, bbox_inches='tight')
-            plt.close()
-            
-            with open(plot2_path, 'rb') as img_file:
-                img_data = base64.b64encode(img_file.read()).decode('utf-8')
-            
-            results.append(TextContent(
-                type="text",
-                text=f"![Energy vs Event](data:image/png;base64,{img_data})"
-            ))
-            
-            # Plot 3: Tracks Distribution
-            plt.figure(figsize=(10, 6))
-            plt.hist(tracks, bins=range(0, int(np.max(tracks))+2), alpha=0.7, color='green', edgecolor='black')
-            plt.xlabel('Number of Tracks Created', fontsize=12)
-            plt.ylabel('Number of Events', fontsize=12)
-            plt.title('Secondary Tracks Distribution', fontsize=14, fontweight='bold')
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            plot3_path = output_dir / "tracks_distribution.png"
-            plt.savefig(plot3_path, dpi=150, bbox_inches='tight')
-            plt.close()
-            
-            with open(plot3_path, 'rb') as img_file:
-                img_data = base64.b64encode(img_file.read()).decode('utf-8')
-            
-            results.append(TextContent(
-                type="text",
-                text=f"![Tracks Distribution](data:image/png;base64,{img_data})"
-            ))
-            
-            # Plot 4: Summary Dashboard
-            fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-            
-            # Energy histogram
-            axes[0, 0].hist(energy_deposited, bins=30, alpha=0.7, color='blue', edgecolor='black')
-            axes[0, 0].set_xlabel('Energy Deposited (MeV)', fontsize=10)
-            axes[0, 0].set_ylabel('Events', fontsize=10)
-            axes[0, 0].set_title('Energy Distribution', fontsize=12, fontweight='bold')
-            axes[0, 0].grid(True, alpha=0.3)
-            
-            # Scatter plot
-            axes[0, 1].scatter(event_id, energy_deposited, alpha=0.5, s=10, color='steelblue')
-            axes[0, 1].set_xlabel('Event ID', fontsize=10)
-            axes[0, 1].set_ylabel('Energy Deposited (MeV)', fontsize=10)
-            axes[0, 1].set_title('Energy per Event', fontsize=12, fontweight='bold')
-            axes[0, 1].grid(True, alpha=0.3)
-            
-            # Tracks histogram
-            axes[1, 0].hist(tracks, bins=range(0, int(np.max(tracks))+2), alpha=0.7, color='green', edgecolor='black')
-            axes[1, 0].set_xlabel('Tracks Created', fontsize=10)
-            axes[1, 0].set_ylabel('Events', fontsize=10)
-            axes[1, 0].set_title('Secondary Tracks', fontsize=12, fontweight='bold')
-            axes[1, 0].grid(True, alpha=0.3)
-            
-            # Statistics text
-            stats_box = f"""Statistics Summary
-
-Total Events: {len(event_id)}
-Mean Energy: {np.mean(energy_deposited):.4f} MeV
-Std Dev: {np.std(energy_deposited):.4f} MeV
-Min: {np.min(energy_deposited):.4f} MeV
-Max: {np.max(energy_deposited):.4f} MeV
-
-Total Deposited: {np.sum(energy_deposited):.2f} MeV
-Mean Tracks: {np.mean(tracks):.1f}
-Mean Interactions: {np.mean(interactions):.1f}"""
-            
-            axes[1, 1].text(0.1, 0.5, stats_box, fontsize=11, family='monospace', 
-                        verticalalignment='center', transform=axes[1, 1].transAxes)
-            axes[1, 1].axis('off')
-            
-            plt.suptitle('GEANT4 Simulation Summary Dashboard', fontsize=16, fontweight='bold')
-            plt.tight_layout()
-            plot4_path = output_dir / "summary_dashboard.png"
-            plt.savefig(plot4_path, dpi=150, bbox_inches='tight')
-            plt.close()
-            
-            with open(plot4_path, 'rb') as img_file:
-                img_data = base64.b64encode(img_file.read()).decode('utf-8')
-            
-            results.append(TextContent(
-                type="text",
-                text=f"![Summary Dashboard](data:image/png;base64,{img_data})"
-            ))
-            
-            # Final summary text
-            summary = f"\n✅ Generated 4 plots from {len(event_id)} events\n📁 Plots saved to: {output_dir}/"
-            results.append(TextContent(type="text", text=summary))
-            
-            return results
+    
+    stats_box = f"""Statistics Summary
+
+Total Events: {n_events}
+Mean Energy: {e_mean:.4f} MeV
+Std Dev: {e_std:.4f} MeV
+Min: {e_min:.4f} MeV
+Max: {e_max:.4f} MeV
+
+Total Deposited: {e_sum:.2f} MeV
+Mean Tracks: {tracks_mean:.1f}
+Mean Interactions: {interactions_mean:.1f}"""
+    
+    return {
+        "n_events": n_events,
+        "event_id": event_id,
+        "energy_deposited": energy_deposited,
+        "energy_hist": (energy_counts, energy_edges),
+        "tracks_hist": (tracks_counts, tracks_edges),
+        "stats_text": stats_text,
+        "stats_box": stats_box,
+    }
+
+
+async def _create_plots(arguments: dict) -> _ToolResult:
+    """Create plots from the ROOT file and return them inline"""
+    root_file = arguments.get("root_file", "output/simulation_results.root")
+    
+    # Every call writes the same output/plots/*.png files, so calls are serialized
+    async with _PLOT_LOCK:
+        # The stat doubles as the existence check, and uproot.open raises the
+        # same error should the file vanish before it is read
+        try:
+            # The run lock keeps save_results() from rewriting the file while
+            # it is stat'ed and read; rendering below works on the loaded copy
+            async with _RUN_LOCK:
+                # save_results() rewrites the ROOT file, which changes its mtime, so
+                # an unchanged stamp with the PNGs still on disk means nothing to redo
+                st = os.stat(root_file)
+                key = (str(Path(root_file).resolve()), st.st_mtime_ns, st.st_size)
+                cached = _PLOT_CACHE.get(key)
+                if cached is not None and all((_PLOT_DIR / name).exists() for name in _PLOT_FILES):
+                    return list(cached)
+                
+                data = await asyncio.to_thread(_load_plot_data, root_file)
+        except FileNotFoundError:
+            return _text(f"ROOT file not found: {root_file}. Run a simulation first.")
         
-        else:
-            return [
-                TextContent(
-                    type="text",
-                    text=f"Unknown tool: {name}"
-                )
-            ]
+        # Create output directory
+        output_dir = _PLOT_DIR
+        output_dir.mkdir(parents=True, exist_ok=True)
+        hist_path, line_path, tracks_path, dashboard_path = (output_dir / name for name in _PLOT_FILES)
+        
+        # The four figures are independent, so render them in parallel
+        energy_hist = data["energy_hist"]
+        tracks_hist = data["tracks_hist"]
+        plots = [
+            ("Energy Deposition Histogram", (plotting.plot_hist, (
+                *energy_hist, hist_path,
+                'Energy Deposited (MeV)', 'Energy Deposition Distribution', 'blue'))),
+            ("Energy vs Event", (plotting.plot_energy_vs_event, (
+                data["event_id"], data["energy_deposited"], line_path))),
+            ("Tracks Distribution", (plotting.plot_hist, (
+                *tracks_hist, tracks_path,
+                'Number of Tracks Created', 'Secondary Tracks Distribution', 'green'))),
+            ("Summary Dashboard", (plotting.plot_dashboard, (
+                energy_hist, tracks_hist, data["event_id"],
+                data["energy_deposited"], data["stats_box"], dashboard_path))),
+        ]
+        images = await _render([job for _, job in plots])
+        
+        # Statistics text first, then each plot as a data URI
+        results = _text(data["stats_text"])
+        for (title, _), img_data in zip(plots, images):
+            results += _text("".join(("![", title, _PNG_DATA_URI, img_data, ")")))
+        
+        # Final summary text
+        summary = f"\n✅ Generated 4 plots from {data['n_events']} events\n📁 Plots saved to: {output_dir}/"
+        results += _text(summary)
+        
+        _PLOT_CACHE.clear()
+        _PLOT_CACHE[key] = results
+    
+    return list(results)
+
+
+# Tool name -> handler coroutine. Each takes the validated arguments dict
+_HANDLERS: dict[str, Callable[[dict], Awaitable[_ToolResult]]] = {
+    "configure_simulation": _configure_simulation,
+    "run_simulation": _run_simulation,
+    "get_simulation_status": _get_simulation_status,
+    "get_results": _get_results,
+    "save_configuration": _save_configuration,
+    "load_configuration": _load_configuration,
+    "create_plots": _create_plots,
+}
+
+if plotting is None:
+    del _HANDLERS["create_plots"]
+
+
+# Newer SDKs (mcp 1.10+) validate arguments against inputSchema themselves
+# unless told not to; with the compiled validators in place that check would
+# only be repeated. Older SDKs neither validate nor accept validate_input
+_CALL_TOOL_OPTIONS = {}
+if _VALIDATORS and "validate_input" in inspect.signature(Server.call_tool).parameters:
+    _CALL_TOOL_OPTIONS["validate_input"] = False
+
+
+@app.call_tool(**_CALL_TOOL_OPTIONS)
+async def handle_call_tool(name: str, arguments: dict | None) -> _ToolResult:
+    """Handle tool calls from Claude"""
+    if arguments is None:
+        arguments = {}
+    
+    handler = _HANDLERS.get(name)
+    if handler is None:
+        return _text(f"Unknown tool: {name}")
+    
+    validate = _VALIDATORS.get(name)
+    if validate is not None:
+        try:
+            arguments = validate(arguments)
+        except fastjsonschema.JsonSchemaException as e:
+            # Raised out of the handler, the SDK turns this into an isError
+            # result, as its own schema check would have
+            raise ValueError(f"Input validation error: {e.message}") from e
+    
+    try:
+        return await handler(arguments)
     
     except Exception as e:
-        return [
-            TextContent(
-                type="text",
-                text=f"Error executing {name}: {str(e)}"
-            )
-        ]
+        return _text(f"Error executing {name}: {str(e)}")
 
 
 async def main():
@@ -539,4 +697,10 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Optional: uvloop's libuv-based event loop speeds up stdio round-trips
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(main())
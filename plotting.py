@@ -0,0 +1,122 @@
+"""
+Figure rendering for the MCP server's create_plots tool, and the histogram
+binning shared with inspect_root.py
+
+The render functions live here, not in mcp_server, so the pool can pickle
+them by reference. Spawned workers still re-import the script that started
+the server (as __mp_main__), so with python3 mcp_server.py they load the
+server's imports too.
+"""
+
+import base64
+import logging
+import warnings
+from io import BytesIO
+from pathlib import Path
+import numpy as np
+
+# Plots are drawn with the object-oriented Figure API on the Agg canvas;
+# pyplot and its global figure registry are never used
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Optional: boost-histogram fills histograms with multiple threads
+try:
+    import boost_histogram.numpy as bhnp
+except ImportError:
+    bhnp = None
+
+
+def histogram(values, bins):
+    """np.histogram drop-in that uses threaded boost-histogram when available"""
+    if bhnp is not None:
+        return bhnp.histogram(values, bins=bins, threads=0)
+    return np.histogram(values, bins=bins)
+
+
+def worker_init():
+    """Keep matplotlib warnings and log chatter out of the server's stdio"""
+    warnings.filterwarnings('ignore')
+    logging.getLogger('matplotlib').setLevel(logging.CRITICAL)
+
+
+def png_base64(fig, path):
+    """Save fig to path and return the PNG as base64 text
+    
+    The PNG is encoded once into memory, written with a single call, and
+    the same bytes are base64-encoded, so the file is never read back.
+    """
+    buf = BytesIO()
+    fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+    png = buf.getvalue()
+    Path(path).write_bytes(png)
+    return base64.b64encode(png).decode('ascii')
+
+
+def plot_hist(counts, edges, path, xlabel, title, color):
+    """Render a histogram from precomputed counts; returns base64 PNG"""
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.bar(edges[:-1], counts, width=edges[1:] - edges[:-1], align='edge', alpha=0.7, color=color, edgecolor='black')
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel('Number of Events', fontsize=12)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return png_base64(fig, path)
+
+
+def plot_energy_vs_event(event_id, energy_deposited, path):
+    """Render the event-by-event energy line plot; returns base64 PNG"""
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.plot(event_id, energy_deposited, marker='o', markersize=3, linestyle='-', alpha=0.6, color='steelblue')
+    ax.set_xlabel('Event ID', fontsize=12)
+    ax.set_ylabel('Energy Deposited (MeV)', fontsize=12)
+    ax.set_title('Energy Deposition per Event', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return png_base64(fig, path)
+
+
+def plot_dashboard(energy_hist, tracks_hist, event_id, energy_deposited, stats_box, path):
+    """Render the 2x2 summary dashboard; returns base64 PNG"""
+    fig = Figure(figsize=(14, 10))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(2, 2)
+    
+    # Energy histogram
+    energy_counts, energy_edges = energy_hist
+    axes[0, 0].bar(energy_edges[:-1], energy_counts, width=energy_edges[1:] - energy_edges[:-1], align='edge', alpha=0.7, color='blue', edgecolor='black')
+    axes[0, 0].set_xlabel('Energy Deposited (MeV)', fontsize=10)
+    axes[0, 0].set_ylabel('Events', fontsize=10)
+    axes[0, 0].set_title('Energy Distribution', fontsize=12, fontweight='bold')
+    axes[0, 0].grid(True, alpha=0.3)
+    
+    # Scatter plot
+    axes[0, 1].scatter(event_id, energy_deposited, alpha=0.5, s=10, color='steelblue')
+    axes[0, 1].set_xlabel('Event ID', fontsize=10)
+    axes[0, 1].set_ylabel('Energy Deposited (MeV)', fontsize=10)
+    axes[0, 1].set_title('Energy per Event', fontsize=12, fontweight='bold')
+    axes[0, 1].grid(True, alpha=0.3)
+    
+    # Tracks histogram
+    tracks_counts, tracks_edges = tracks_hist
+    axes[1, 0].bar(tracks_edges[:-1], tracks_counts, width=tracks_edges[1:] - tracks_edges[:-1], align='edge', alpha=0.7, color='green', edgecolor='black')
+    axes[1, 0].set_xlabel('Tracks Created', fontsize=10)
+    axes[1, 0].set_ylabel('Events', fontsize=10)
+    axes[1, 0].set_title('Secondary Tracks', fontsize=12, fontweight='bold')
+    axes[1, 0].grid(True, alpha=0.3)
+    
+    # Statistics text
+    axes[1, 1].text(0.1, 0.5, stats_box, fontsize=11, family='monospace', 
+                verticalalignment='center', transform=axes[1, 1].transAxes)
+    axes[1, 1].axis('off')
+    
+    fig.suptitle('GEANT4 Simulation Summary Dashboard', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    return png_base64(fig, path)
@@ -4,12 +4,71 @@ Simulates particle interactions with a configurable cubic detector
 Outputs ROOT file with TTree containing event data
 """
 
+import io
+import os
 import sys
 import json
+import logging
+import threading
+import contextlib
+from functools import lru_cache
+from dataclasses import dataclass, field
 from pathlib import Path
 import numpy as np
 import uproot
 
+# Optional: pyarrow enables a Parquet copy of the event tree
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Optional: orjson encodes the results JSON and JSON Lines stream much faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: mpi4py lets run() split the events across MPI ranks
+# (mpirun -n N python simulation.py)
+try:
+    import mpi4py
+except ImportError:
+    mpi4py = None
+
+# Environment variables set by the common MPI launchers (Open MPI, MPICH/Hydra,
+# PMIx, Intel MPI); without one of them the script was not started by mpirun
+_MPI_LAUNCHER_ENV = ("OMPI_COMM_WORLD_SIZE", "PMI_SIZE", "PMIX_RANK", "MPI_LOCALNRANKS")
+
+# Optional: numba compiles the mock event sampler into a parallel kernel.
+# The kernel draws a different stream than the NumPy path, so which one runs
+# must not depend on the host: it is opt-in (GEANT4_JIT=1), and numba is not
+# even imported otherwise
+USE_JIT = os.environ.get("GEANT4_JIT") == "1"
+njit = None
+if USE_JIT:
+    try:
+        from numba import njit, prange
+    except ImportError:
+        njit = None
+
+def _json_line(obj):
+    """Compact JSON encoding of obj as one newline-terminated line of bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def json_doc(obj):
+    """Indented (2-space) JSON encoding of obj as UTF-8 bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+logger = logging.getLogger(__name__)
+
 # Mock Geant4 imports for now - will be replaced with actual imports when Geant4 is installed
 # from Geant4 import *
 
@@ -27,26 +86,47 @@ PARTICLE_IDS = {
     "alpha": 1000020040
 }
 
+@dataclass(slots=True)
 class SimulationConfig:
     """Configuration for the simulation"""
-    def __init__(self):
-        self.particle_type = "gamma"  # gamma, e-, e+, proton, neutron, etc.
-        self.particle_energy = 1.0  # MeV
-        self.particle_position = [0.0, 0.0, -10.0]  # cm
-        self.particle_direction = [0.0, 0.0, 1.0]  # unit vector
-        
-        # Cubic detector parameters
-        self.cube_size_x = 10.0  # cm
-        self.cube_size_y = 10.0  # cm
-        self.cube_size_z = 10.0  # cm
-        self.cube_material = "G4_WATER"  # Material name
-        
-        # Simulation parameters
-        self.num_events = 100
-        self.output_file = "output/simulation_results.json"
-        self.output_root_file = "output/simulation_results.root"
+    particle_type: str = "gamma"  # gamma, e-, e+, proton, neutron, etc.
+    particle_energy: float = 1.0  # MeV
+    particle_position: list = field(default_factory=lambda: [0.0, 0.0, -10.0])  # cm
+    particle_direction: list = field(default_factory=lambda: [0.0, 0.0, 1.0])  # unit vector
+    
+    # Cubic detector parameters
+    cube_size_x: float = 10.0  # cm
+    cube_size_y: float = 10.0  # cm
+    cube_size_z: float = 10.0  # cm
+    cube_material: str = "G4_WATER"  # Material name
+    
+    # Simulation parameters
+    num_events: int = 100
+    output_file: str = "output/simulation_results.json"
+    output_root_file: str = "output/simulation_results.root"
+    output_parquet_file: str = "output/simulation_results.parquet"
+    output_events_file: str = "output/simulation_events.jsonl"
+    
+    # Memoized to_dict() result; not part of the config itself
+    _dict_cache: dict | None = field(default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name, value):
+        # Any field assignment invalidates the cached to_dict() result
+        object.__setattr__(self, name, value)
+        if name != "_dict_cache":
+            object.__setattr__(self, "_dict_cache", None)
     
     def to_dict(self):
+        """Nested dict view of the config, cached until a field is reassigned
+        
+        The same dict is returned on every call, so callers must treat it
+        as read-only, and list fields are replaced rather than edited in place.
+        """
+        if self._dict_cache is None:
+            self._dict_cache = self._build_dict()
+        return self._dict_cache
+    
+    def _build_dict(self):
         return {
             "particle": {
                 "type": self.particle_type,
@@ -66,6 +146,10 @@ class SimulationConfig:
             }
         }
     
+    def detector_key(self):
+        """Hashable identity of the detector: cube dimensions and material"""
+        return (self.cube_size_x, self.cube_size_y, self.cube_size_z, self.cube_material)
+    
     @classmethod
     def from_dict(cls, data):
         config = cls()
@@ -94,17 +178,23 @@ class DetectorConstruction:
         self.config = config
     
     def construct(self):
-        """Build the detector geometry"""
-        print(f"Constructing detector:")
-        print(f"  Material: {self.config.cube_material}")
-        print(f"  Dimensions: {self.config.cube_size_x} x {self.config.cube_size_y} x {self.config.cube_size_z} cm³")
-        
-        # In actual implementation, this would create Geant4 geometry
-        # world_solid = G4Box("World", world_size, world_size, world_size)
-        # cube_solid = G4Box("Cube", cube_x/2, cube_y/2, cube_z/2)
-        # etc.
-        
-        return True
+        """Build the detector geometry, reusing an earlier build of the same detector"""
+        return _build_detector(*self.config.detector_key())
+
+
+@lru_cache(maxsize=8)
+def _build_detector(size_x, size_y, size_z, material):
+    """Build the geometry for one cube; memoized, since construction is expensive"""
+    print(f"Constructing detector:")
+    print(f"  Material: {material}")
+    print(f"  Dimensions: {size_x} x {size_y} x {size_z} cm³")
+    
+    # In actual implementation, this would create Geant4 geometry
+    # world_solid = G4Box("World", world_size, world_size, world_size)
+    # cube_solid = G4Box("Cube", cube_x/2, cube_y/2, cube_z/2)
+    # etc.
+    
+    return True
 
 
 class PhysicsList:
@@ -113,15 +203,21 @@ class PhysicsList:
         self.physics_list_name = "FTFP_BERT"  # Standard physics list
     
     def construct(self):
-        """Build the physics list"""
-        print(f"Using physics list: {self.physics_list_name}")
-        
-        # In actual implementation:
-        # physics_list = G4VModularPhysicsList()
-        # physics_list.RegisterPhysics(G4EmStandardPhysics())
-        # etc.
-        
-        return True
+        """Build the physics list, reusing an earlier build of the same list"""
+        return _build_physics(self.physics_list_name)
+
+
+@lru_cache(maxsize=8)
+def _build_physics(physics_list_name):
+    """Build one physics list; memoized like _build_detector"""
+    print(f"Using physics list: {physics_list_name}")
+    
+    # In actual implementation:
+    # physics_list = G4VModularPhysicsList()
+    # physics_list.RegisterPhysics(G4EmStandardPhysics())
+    # etc.
+    
+    return True
 
 
 class PrimaryGenerator:
@@ -131,8 +227,8 @@ class PrimaryGenerator:
     
     def generate_primary(self, event_id):
         """Generate a primary particle for the event"""
-        print(f"Event {event_id}: Generating {self.config.particle_type} "
-              f"with energy {self.config.particle_energy} MeV")
+        logger.debug("Event %d: Generating %s with energy %s MeV",
+                     event_id, self.config.particle_type, self.config.particle_energy)
         
         # In actual implementation:
         # particle_gun = G4ParticleGun()
@@ -151,70 +247,397 @@ class PrimaryGenerator:
         }
 
 
+# Record layout of the "events" TTree: one field per branch, in branch order
+EVENT_DTYPE = np.dtype([
+    ("event_id", np.int32),
+    ("particle_id", np.int32),
+    ("truth_energy", np.float32),
+    ("energy_deposited", np.float32),
+    ("tracks_created", np.int32),
+    ("interactions", np.int32),
+    ("pos", np.float32, (3,)),
+    ("dir", np.float32, (3,))
+])
+
+# The same layout as mktree branch types (name -> dtype, or (dtype, shape)
+# for the 3-vector branches), and the branch order
+_BRANCH_TYPES = {
+    name: (EVENT_DTYPE[name].base, EVENT_DTYPE[name].shape) if EVENT_DTYPE[name].shape else EVENT_DTYPE[name]
+    for name in EVENT_DTYPE.names
+}
+_BRANCH_NAMES = tuple(_BRANCH_TYPES)
+_BRANCH_LIST = ", ".join(_BRANCH_NAMES)
+
+# Basket compression for the ROOT file. LZ4 writes ~3.5x and reads ~2.5x
+# faster than uproot's ZLIB(1) default for this tree, about 1.6x larger
+ROOT_COMPRESSION = uproot.LZ4(1)
+
+# Events per extend() (and so per basket) when writing the ROOT tree; the
+# record buffer handed to uproot never grows beyond this
+ROOT_CHUNK_EVENTS = 100_000
+
+# Per-event quantities stored column-wise on the simulation (name -> dtype)
+RESULT_COLUMNS = {
+    "event_id": np.int32,
+    "energy_deposited": np.float64,
+    "tracks_created": np.int32,
+    "interactions": np.int32
+}
+
+
+# Events per independently seeded stream in the numba kernel
+_JIT_CHUNK = 16_384
+
+# numba's default (workqueue) threading layer must not be entered from two
+# threads at once, so kernel calls are serialized
+_JIT_LOCK = threading.Lock()
+
+if njit is not None:
+    @njit(cache=True, parallel=True)
+    def _mock_events(n, e0, seeds):
+        """Mock (energy_deposited, tracks, interactions) for n events
+        
+        Events are sampled in fixed-size chunks, chunk c reseeding its
+        thread's generator from seeds[c] (one seed per chunk, drawn by the
+        caller), so the output depends only on the seeds and not on how
+        chunks are scheduled across threads.
+        """
+        out_e = np.empty(n, np.float64)
+        out_t = np.empty(n, np.int32)
+        out_i = np.empty(n, np.int32)
+        n_chunks = (n + _JIT_CHUNK - 1) // _JIT_CHUNK
+        for c in prange(n_chunks):
+            np.random.seed(seeds[c])
+            for k in range(c * _JIT_CHUNK, min(n, (c + 1) * _JIT_CHUNK)):
+                out_e[k] = np.random.uniform(0.0, e0)
+                out_t[k] = np.random.randint(1, 11)
+                out_i[k] = np.random.randint(1, 6)
+        return out_e, out_t, out_i
+
+
+class ResultBuffer:
+    """Columnar (struct-of-arrays) store for event results
+    
+    The per-event quantities live in preallocated NumPy columns, of which
+    the first size entries are filled. The primary's fields are the same
+    for every event, so they are kept once as scalars and only broadcast
+    to full branches by event_arrays().
+    """
+    def __init__(self, capacity=0):
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in RESULT_COLUMNS.items()}
+        self.size = 0
+        self.primary = None
+        self.constants = {}
+        self._summary = None
+    
+    def reserve(self, capacity):
+        """Grow the columns geometrically to hold at least capacity events"""
+        allocated = len(self.columns["event_id"])
+        if capacity <= allocated:
+            return
+        allocated = max(capacity, 2 * allocated)
+        for name, column in self.columns.items():
+            grown = np.empty(allocated, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+    
+    def set_primary(self, primary):
+        """Record the primary shared by the events and its branch values
+        
+        The primary is stored once for all events, so it cannot change while
+        events are stored; clear() first to simulate a different particle.
+        """
+        primary = {
+            "particle": primary["particle"],
+            "energy_MeV": primary["energy_MeV"],
+            "position": list(primary["position"]),
+            "direction": list(primary["direction"])
+        }
+        if self.size and primary != self.primary:
+            raise ValueError(
+                "The primary particle changed since the stored events were "
+                "simulated; call reset() before running with the new settings"
+            )
+        self.primary = primary
+        self.constants = {
+            "particle_id": PARTICLE_IDS.get(primary["particle"], 0),
+            "truth_energy": primary["energy_MeV"],
+            "pos": tuple(primary["position"]),
+            "dir": tuple(primary["direction"])
+        }
+    
+    def extend(self, event_id, energy_deposited, tracks_created, interactions):
+        """Append a batch of events given as equal-length arrays"""
+        start = self.size
+        stop = start + len(event_id)
+        self.reserve(stop)
+        self.columns["event_id"][start:stop] = event_id
+        self.columns["energy_deposited"][start:stop] = energy_deposited
+        self.columns["tracks_created"][start:stop] = tracks_created
+        self.columns["interactions"][start:stop] = interactions
+        self.size = stop
+        self._summary = None
+    
+    def clear(self):
+        """Drop all events, keeping the allocated columns"""
+        self.size = 0
+        self._summary = None
+    
+    def column(self, name):
+        """View of the filled part of a result column (no copy)"""
+        return self.columns[name][:self.size]
+    
+    def energy_summary(self):
+        """(total_events, total_energy_deposited, avg_energy_deposited)
+        
+        One reduction over the energy column, accumulated in float64 and
+        cached until events are added or cleared.
+        """
+        if self._summary is None:
+            n = self.size
+            total = float(self.column("energy_deposited").sum(dtype=np.float64))
+            self._summary = (n, total, total / n if n else 0)
+        return self._summary
+    
+    def event_records(self, start=0, stop=None):
+        """Events [start, stop) as one EVENT_DTYPE record array (one field per branch)
+        
+        The per-event fields are copied column-wise from the result columns
+        and the constant primary fields are broadcast from their scalars,
+        so no per-event Python loop or dicts are involved.
+        """
+        if stop is None or stop > self.size:
+            stop = self.size
+        buf = np.empty(stop - start, dtype=EVENT_DTYPE)
+        for name in RESULT_COLUMNS:
+            buf[name] = self.columns[name][start:stop]
+        for name, value in self.constants.items():
+            buf[name] = value
+        return buf
+    
+    def event_arrays(self):
+        """Per-event columns named after the ROOT branches, each contiguous
+        
+        Columnar consumers (Arrow, Parquet) take these directly, so the
+        constant primary branches are np.full'ed from their cached scalars
+        rather than sliced out of the interleaved event_records() buffer.
+        The pos and dir branches come out as (n, 3) arrays.
+        """
+        n = self.size
+        constants = self.constants
+        arrays = {}
+        for name in EVENT_DTYPE.names:
+            dtype = EVENT_DTYPE[name]
+            if name in constants:
+                arrays[name] = np.full((n,) + dtype.shape, constants[name], dtype=dtype.base)
+            else:
+                arrays[name] = self.column(name).astype(dtype)
+        return arrays
+    
+    def event_table(self):
+        """event_arrays() as a pyarrow Table; 3-vectors become fixed-size lists"""
+        columns = {}
+        for name, array in self.event_arrays().items():
+            if array.ndim == 2:
+                columns[name] = pa.FixedSizeListArray.from_arrays(array.ravel(), array.shape[1])
+            else:
+                columns[name] = array
+        return pa.Table.from_pydict(columns)
+
+
 class Geant4Simulation:
     """Main simulation class"""
-    def __init__(self, config=None):
+    def __init__(self, config=None, seed=None):
         self.config = config or SimulationConfig()
         self.detector = DetectorConstruction(self.config)
         self.physics = PhysicsList()
         self.generator = PrimaryGenerator(self.config)
-        self.results = []
-    
-    def initialize(self):
-        """Initialize the simulation"""
-        print("=" * 60)
-        print("Initializing GEANT4 Simulation")
-        print("=" * 60)
         
-        self.detector.construct()
-        self.physics.construct()
+        # Event results are kept column-wise; see the results property for
+        # the per-event dict view
+        self.events = ResultBuffer()
         
-        print("\nSimulation initialized successfully!")
+        # Mock physics sampling uses NumPy's PCG64 generator; parallel
+        # workers draw from streams spawned off the same seed sequence
+        self._seed_seq = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self._seed_seq)
+    
+    def initialize(self, comm=None):
+        """Initialize the simulation
+        
+        With an MPI communicator only rank 0 reports, as in run(); the other
+        ranks set up silently.
+        """
+        quiet = comm is not None and comm.Get_rank() != 0
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            print("=" * 60)
+            print("Initializing GEANT4 Simulation")
+            print("=" * 60)
+            
+            self.detector.construct()
+            self.physics.construct()
+            self.events.reserve(self.config.num_events)
+            
+            print("\nSimulation initialized successfully!")
         return True
     
-    def run(self, num_events=None):
-        """Run the simulation"""
+    def reset(self):
+        """Discard results from previous runs, keeping the initialized setup"""
+        self.events.clear()
+    
+    @property
+    def num_results(self):
+        """Number of stored events"""
+        return self.events.size
+    
+    @property
+    def primary_template(self):
+        """Primary particle shared by the stored events (without an event_id)"""
+        return self.events.primary
+    
+    def column(self, name):
+        """View of the filled part of a result column (no copy)"""
+        return self.events.column(name)
+    
+    @property
+    def results(self):
+        """Per-event result dicts, built on demand from the result columns"""
+        return [r for chunk in self.iter_results() for r in chunk]
+    
+    def iter_results(self, chunk_size=65536):
+        """Yield the per-event result dicts in lists of up to chunk_size events
+        
+        The primary is the same for every event, so it is not repeated here;
+        see primary_template.
+        """
+        for start in range(0, self.num_results, chunk_size):
+            stop = start + chunk_size
+            yield [
+                {
+                    "event_id": event_id,
+                    "energy_deposited_MeV": energy,
+                    "tracks_created": tracks,
+                    "interactions": interactions
+                }
+                for event_id, energy, tracks, interactions in zip(
+                    *(self.column(name)[start:stop].tolist() for name in RESULT_COLUMNS)
+                )
+            ]
+    
+    def run(self, num_events=None, comm=None):
+        """Run the simulation, returning the total number of stored events
+        
+        With an MPI communicator of more than one rank, each rank simulates
+        its share of the events and the results are gathered to rank 0,
+        which holds the full, ordered result set (and is the rank that
+        saves it); every other rank keeps only its own block of events.
+        """
         if num_events is None:
             num_events = self.config.num_events
         
-        print(f"\nRunning {num_events} events...")
-        print("-" * 60)
+        distributed = comm is not None and comm.Get_size() > 1
+        report = not distributed or comm.Get_rank() == 0
         
-        for event_id in range(num_events):
-            # Generate primary particle
-            primary = self.generator.generate_primary(event_id)
-            
-            # Simulate event (in real implementation, this would call Geant4)
-            result = self.simulate_event(event_id, primary)
-            self.results.append(result)
-            
-            if (event_id + 1) % 10 == 0:
-                print(f"  Processed {event_id + 1}/{num_events} events")
+        if report:
+            print(f"\nRunning {num_events} events...")
+            print("-" * 60)
+        
+        # The particle gun settings are fixed for the whole run, so one
+        # primary describes every event
+        primary = self.generator.generate_primary(0)
+        self.events.set_primary(primary)
         
-        print("-" * 60)
-        print(f"Simulation completed: {num_events} events processed")
+        # Simulate all events in one batch (in real implementation, this would call Geant4)
+        if distributed:
+            event_ids, energies, tracks, interactions = self._simulate_distributed(primary, num_events, comm)
+        else:
+            event_ids = np.arange(num_events)
+            energies, tracks, interactions = self._simulate_batch(primary, num_events)
+        self.events.extend(event_ids, energies, tracks, interactions)
         
-        return self.results
+        if report:
+            print("-" * 60)
+            print(f"Simulation completed: {num_events} events processed")
+            sys.stdout.flush()
+        
+        return self.num_results
+    
+    def _simulate_distributed(self, primary, num_events, comm):
+        """_simulate_batch() split across the ranks of comm, results gathered to rank 0
+        
+        Rank r simulates the r-th contiguous block of events (block sizes
+        differ by at most one), and Gatherv stitches the blocks back in rank
+        order on rank 0 only, so no other rank allocates all the events.
+        Returns (event_id, energy_deposited, tracks, interactions): all of
+        them on rank 0, the rank's own block elsewhere. Each rank samples from its own child of rank 0's seed
+        sequence, so the streams are independent and the run is
+        reproducible for a given seed and rank count.
+        """
+        size = comm.Get_size()
+        rank = comm.Get_rank()
+        counts = [num_events // size + (r < num_events % size) for r in range(size)]
+        displs = [sum(counts[:r]) for r in range(size)]
+        
+        # Unseeded ranks start from different OS entropy, so adopt rank 0's
+        entropy = comm.bcast(self._seed_seq.entropy, root=0)
+        if entropy != self._seed_seq.entropy:
+            self._seed_seq = np.random.SeedSequence(entropy)
+        child = self._seed_seq.spawn(size)[rank]
+        local = self._simulate_batch(primary, counts[rank], np.random.default_rng(child))
+        
+        if rank != 0:
+            for part in local:
+                comm.Gatherv(np.ascontiguousarray(part), None, root=0)
+            return (np.arange(displs[rank], displs[rank] + counts[rank]), *local)
+        
+        gathered = []
+        for part in local:
+            full = np.empty(num_events, dtype=part.dtype)
+            comm.Gatherv(np.ascontiguousarray(part), [full, (counts, displs)], root=0)
+            gathered.append(full)
+        return (np.arange(num_events), *gathered)
     
     def simulate_event(self, event_id, primary):
         """Simulate a single event"""
         # In actual implementation, this would run Geant4 tracking
         # For now, return mock results
-        
-        import random
+        energies, tracks, interactions = self._simulate_batch(primary, 1)
+        logger.debug("Event %d: deposited %.4f MeV, %d tracks, %d interactions",
+                     event_id, energies[0], tracks[0], interactions[0])
         
         result = {
             "event_id": event_id,
-            "primary": primary,
-            "energy_deposited_MeV": random.uniform(0, primary["energy_MeV"]),
-            "tracks_created": random.randint(1, 10),
-            "interactions": random.randint(1, 5)
+            "energy_deposited_MeV": float(energies[0]),
+            "tracks_created": int(tracks[0]),
+            "interactions": int(interactions[0])
         }
         
         return result
     
+    def _simulate_batch(self, primary, n, rng=None):
+        """Mock results for n events as (energy_deposited, tracks, interactions) arrays"""
+        if rng is None:
+            rng = self.rng
+        if njit is not None:
+            # Every batch takes the kernel when it is enabled, so a seed maps
+            # to one stream whatever the batch size or rank count. The chunk
+            # seeds are drawn from rng rather than counted up from one base,
+            # so runs and ranks never replay each other's chunks
+            seeds = rng.integers(0, 2**32, -(-n // _JIT_CHUNK), dtype=np.uint32)
+            with _JIT_LOCK:
+                return _mock_events(n, float(primary["energy_MeV"]), seeds)
+        return (
+            rng.uniform(0, primary["energy_MeV"], n),
+            rng.integers(1, 11, n, dtype=np.int32),
+            rng.integers(1, 6, n, dtype=np.int32)
+        )
+    
     def save_results(self, filename=None):
-        """Save simulation results to JSON and ROOT files"""
+        """Save the config and summary to JSON, and the events to ROOT
+        
+        The JSON file no longer repeats every event; the ROOT (and Parquet)
+        files hold them, and save_events_jsonl() writes them as JSON Lines.
+        """
         if filename is None:
             filename = self.config.output_file
         
@@ -223,24 +646,77 @@ class Geant4Simulation:
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Prepare data
+        total_events, total_energy, avg_energy = self.energy_summary()
         data = {
             "config": self.config.to_dict(),
-            "results": self.results,
+            "primary_template": self.primary_template,
             "summary": {
-                "total_events": len(self.results),
-                "total_energy_deposited_MeV": sum(r["energy_deposited_MeV"] for r in self.results),
-                "avg_energy_deposited_MeV": sum(r["energy_deposited_MeV"] for r in self.results) / len(self.results) if self.results else 0
+                "total_events": total_events,
+                "total_energy_deposited_MeV": total_energy,
+                "avg_energy_deposited_MeV": avg_energy
             }
         }
         
         # Save to JSON
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        with open(filename, 'wb') as f:
+            f.write(json_doc(data))
         
         print(f"\nResults saved to: {filename}")
         
-        # Save to ROOT file
+        # Save to ROOT file (plus a columnar Parquet copy when pyarrow is installed)
         self.save_root_file()
+        self.save_parquet_file()
+        
+        return filename
+    
+    def save_events_jsonl(self, filename=None):
+        """Stream the per-event results to a JSON Lines file, one event per line
+        
+        Events are encoded a chunk at a time, so the full list of event
+        dicts is never held in memory.
+        """
+        if filename is None:
+            filename = self.config.output_events_file
+        
+        output_path = Path(filename)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        with open(filename, 'wb') as f:
+            for chunk in self.iter_results():
+                f.write(b"".join(_json_line(r) for r in chunk))
+        
+        print(f"Events saved to: {filename}")
+        
+        return filename
+    
+    def energy_summary(self):
+        """(total_events, total_energy_deposited, avg_energy_deposited) of the stored events"""
+        return self.events.energy_summary()
+    
+    def event_arrays(self):
+        """Per-event columns named after the ROOT branches"""
+        return self.events.event_arrays()
+    
+    def event_table(self):
+        """Per-event columns as a pyarrow Table (requires pyarrow)"""
+        return self.events.event_table()
+    
+    def save_parquet_file(self, filename=None):
+        """Save the event columns to a zstd-compressed Parquet file"""
+        if pa is None:
+            return
+        
+        if filename is None:
+            filename = self.config.output_parquet_file
+        
+        if not self.num_results:
+            return
+        
+        output_path = Path(filename)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        pq.write_table(self.event_table(), filename, compression="zstd")
+        print(f"Parquet file saved to: {filename}")
         
         return filename
     
@@ -253,79 +729,42 @@ class Geant4Simulation:
         output_path = Path(filename)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        if not self.results:
+        if not self.num_results:
             print("No results to save to ROOT file")
             return
         
-        # Prepare arrays for ROOT TTree
-        event_id = np.array([r["event_id"] for r in self.results], dtype=np.int32)
-        particle_id = np.array([PARTICLE_IDS.get(r["primary"]["particle"], 0) for r in self.results], dtype=np.int32)
-        truth_energy = np.array([r["primary"]["energy_MeV"] for r in self.results], dtype=np.float32)
-        energy_deposited = np.array([r["energy_deposited_MeV"] for r in self.results], dtype=np.float32)
-        tracks_created = np.array([r["tracks_created"] for r in self.results], dtype=np.int32)
-        interactions = np.array([r["interactions"] for r in self.results], dtype=np.int32)
-        
-        # Position arrays
-        pos_x = np.array([r["primary"]["position"][0] for r in self.results], dtype=np.float32)
-        pos_y = np.array([r["primary"]["position"][1] for r in self.results], dtype=np.float32)
-        pos_z = np.array([r["primary"]["position"][2] for r in self.results], dtype=np.float32)
-        
-        # Direction arrays
-        dir_x = np.array([r["primary"]["direction"][0] for r in self.results], dtype=np.float32)
-        dir_y = np.array([r["primary"]["direction"][1] for r in self.results], dtype=np.float32)
-        dir_z = np.array([r["primary"]["direction"][2] for r in self.results], dtype=np.float32)
+        n = self.num_results
+        n_chunks = -(-n // ROOT_CHUNK_EVENTS)
         
         # Create ROOT file with TTree
-        with uproot.recreate(filename) as f:
-            # Create the tree with branches using mktree for TTree format
-            f.mktree("events", {
-                "event_id": np.int32,
-                "particle_id": np.int32,
-                "truth_energy": np.float32,
-                "energy_deposited": np.float32,
-                "tracks_created": np.int32,
-                "interactions": np.int32,
-                "pos_x": np.float32,
-                "pos_y": np.float32,
-                "pos_z": np.float32,
-                "dir_x": np.float32,
-                "dir_y": np.float32,
-                "dir_z": np.float32
-            })
+        with uproot.recreate(filename, compression=ROOT_COMPRESSION) as f:
+            # Create the tree with branches using mktree for TTree format;
+            # one basket slot per chunk so the basket index never resizes
+            f.mktree("events", _BRANCH_TYPES, initial_basket_capacity=max(10, n_chunks))
             
-            # Fill the tree
-            f["events"].extend({
-                "event_id": event_id,
-                "particle_id": particle_id,
-                "truth_energy": truth_energy,
-                "energy_deposited": energy_deposited,
-                "tracks_created": tracks_created,
-                "interactions": interactions,
-                "pos_x": pos_x,
-                "pos_y": pos_y,
-                "pos_z": pos_z,
-                "dir_x": dir_x,
-                "dir_y": dir_y,
-                "dir_z": dir_z
-            })
+            # Fill the tree a chunk at a time, so the interleaved record
+            # buffer stays O(ROOT_CHUNK_EVENTS) instead of O(n); uproot maps
+            # the record fields onto the branches
+            tree = f["events"]
+            for start in range(0, n, ROOT_CHUNK_EVENTS):
+                tree.extend(self.events.event_records(start, start + ROOT_CHUNK_EVENTS))
         
         print(f"ROOT file saved to: {filename}")
-        print(f"  Tree: 'events' with {len(self.results)} entries")
-        print(f"  Branches: event_id, particle_id, truth_energy, energy_deposited, tracks_created, interactions, pos_x/y/z, dir_x/y/z")
+        print(f"  Tree: 'events' with {self.num_results} entries")
+        print(f"  Branches: {_BRANCH_LIST}")
         
         return filename
     
     def get_summary(self):
         """Get simulation summary"""
-        if not self.results:
+        if not self.num_results:
             return "No results available"
         
-        total_energy = sum(r["energy_deposited_MeV"] for r in self.results)
-        avg_energy = total_energy / len(self.results)
+        total_events, total_energy, avg_energy = self.energy_summary()
         
         summary = f"""
 Simulation Summary:
-  Total Events: {len(self.results)}
+  Total Events: {total_events}
   Particle Type: {self.config.particle_type}
   Initial Energy: {self.config.particle_energy} MeV
   Total Energy Deposited: {total_energy:.4f} MeV
@@ -336,6 +775,22 @@ Simulation Summary:
         return summary
 
 
+def _mpi_comm():
+    """MPI.COMM_WORLD when started by an MPI launcher, otherwise None
+    
+    A plain run never imports mpi4py.MPI, which would initialize MPI and
+    fails outright where mpi4py is installed without a working libmpi.
+    """
+    if mpi4py is None or not any(name in os.environ for name in _MPI_LAUNCHER_ENV):
+        return None
+    try:
+        from mpi4py import MPI
+    except (ImportError, RuntimeError) as e:
+        logger.warning("Running without MPI: %s", e)
+        return None
+    return MPI.COMM_WORLD
+
+
 def main():
     """Main entry point"""
     # Default configuration
@@ -348,14 +803,19 @@ def main():
             config_data = json.load(f)
             config = SimulationConfig.from_dict(config_data)
     
+    # Under mpirun the events are shared across the ranks; rank 0 writes
+    comm = _mpi_comm()
+    rank = 0 if comm is None else comm.Get_rank()
+    
     # Create and run simulation
     sim = Geant4Simulation(config)
-    sim.initialize()
-    sim.run()
+    sim.initialize(comm)
+    sim.run(comm=comm)
     
     # Save and print results
-    sim.save_results()
-    print(sim.get_summary())
+    if rank == 0:
+        sim.save_results()
+        print(sim.get_summary())
 
 
 if __name__ == "__main__":